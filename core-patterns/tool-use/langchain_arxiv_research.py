@@ -1,7 +1,7 @@
 from typing import TypedDict, Annotated, List, Dict
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
-from langchain_core.tools import tool
+from langchain_core.tools import ToolException, tool
 from langgraph.graph import StateGraph, END, START
 from langgraph.prebuilt import ToolExecutor, tools_condition, ToolNode
 from langgraph.graph.message import add_messages
@@ -19,6 +19,9 @@ project_root = Path(__file__).parent.parent.parent
 sys.path.append(str(project_root))
 
 from tools.arxiv import search_papers, get_paper_by_id
+from tools.arxiv_pdf import search_paper_content as search_paper_chunks
+from tools.tool_memo import MemoizedToolNode, merge_memo
+from tools.model_cascade import default_cascade
 
 # Load environment variables
 load_dotenv()
@@ -59,7 +62,7 @@ def get_paper_details(paper_id: str) -> str:
 
     paper = get_paper_by_id(paper_id)
     if "error" in paper:
-        return f"Error fetching paper details: {paper['error']}"
+        raise ToolException(f"Error fetching paper details: {paper['error']}")
 
     return f"""
 Title: {paper['title']}
@@ -78,15 +81,45 @@ PDF URL: {paper['url']}
 """
 
 
-tools = [search_arxiv, get_paper_details]
+@tool
+def search_paper_content(paper_id: str, question: str) -> str:
+    """Search the full text of an arXiv paper and return the passages most relevant to the question."""
+    logger.info(f"📖 Searching content of paper {paper_id} for: {question}")
+
+    try:
+        chunks = search_paper_chunks(paper_id, question)
+    except Exception as e:
+        raise ToolException(f"Error searching paper content: {str(e)}") from e
+
+    if not chunks:
+        return "No relevant passages found in the paper."
+
+    response = f"Most relevant passages from paper {paper_id}:\n\n"
+    for chunk in chunks:
+        response += f"[Page {chunk['page']}]\n{chunk['content']}\n\n"
+
+    return response
+
+
+tools = [search_arxiv, get_paper_details, search_paper_content]
+
+# A ToolException becomes a ToolMessage with the error text and status="error",
+# so the LLM sees a plain message and the failed call is not memoized
+for t in tools:
+    t.handle_tool_error = True
+
+# How long each tool result can be reused within a thread (None = forever)
+TOOL_MEMO_TTL = {
+    "search_arxiv": 24 * 60 * 60,
+    "get_paper_details": None,
+    "search_paper_content": None,
+}
 
 ## LLM SETUP ##
 
-# Create the LLM
-llm = ChatOpenAI(
-    model="gpt-3.5-turbo",
-    temperature=0.7,
-)
+# Create the LLMs: a cheap model is tried first and a stronger one is only
+# used when its tool call is invalid
+cascade = default_cascade(tools)
 
 # Create the prompt template
 system_message = SystemMessage(
@@ -94,8 +127,9 @@ system_message = SystemMessage(
     1. Understand user requests for research papers and scientific information
     2. Use the search_arxiv tool to find relevant papers based on the query
     3. Use get_paper_details when users want more information about a specific paper
-    4. Respond in a clear, academic manner
-    5. If the query is too vague, ask for clarification
+    4. Use search_paper_content to answer questions about the contents of a paper (methods, results, etc.)
+    5. Respond in a clear, academic manner
+    6. If the query is too vague, ask for clarification
     
     Important guidelines:
     - Focus on finding the most relevant papers for the user's query
@@ -109,21 +143,20 @@ system_message = SystemMessage(
     Action: Search for papers about transformer architectures, focusing on recent publications"""
 )
 
-llm_with_tools = llm.bind_tools(tools)
-
 ## GRAPH ##
 
 
 # Define our state
 class AgentState(TypedDict):
     messages: Annotated[list, add_messages]
+    tool_memo: Annotated[dict, merge_memo]
 
 
 # Node
 def assistant(state: AgentState):
     """Agent that processes the user input and returns research information."""
     messages = state["messages"]
-    message = llm_with_tools.invoke([system_message] + messages)
+    message = cascade.invoke([system_message] + messages)
     return {"messages": [message]}
 
 
@@ -132,7 +165,7 @@ builder = StateGraph(AgentState)
 
 # Add nodes
 builder.add_node("assistant", assistant)
-builder.add_node("tools", ToolNode(tools))
+builder.add_node("tools", MemoizedToolNode(tools, TOOL_MEMO_TTL))
 
 # Add edges
 builder.add_edge(START, "assistant")
@@ -178,3 +211,5 @@ if __name__ == "__main__":
                 m.pretty_print()
             else:
                 print(m)
+
+        print(cascade.stats())
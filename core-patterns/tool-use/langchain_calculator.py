@@ -1,5 +1,12 @@
-from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+from tools.model_cascade import default_cascade
 
 load_dotenv()
 
@@ -66,9 +73,9 @@ def exponent(a: float, b: float) -> float:
 
 tools = [multiply, divide, add, subtract, exponent]
 
-llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.7)
-
-llm_with_tools = llm.bind_tools(tools)
+# Create the LLMs: a cheap model is tried first and a stronger one is only
+# used when its tool call is invalid
+cascade = default_cascade(tools)
 
 
 ## GRAPH ##
@@ -98,23 +105,58 @@ system_message = SystemMessage(
 
 # Node
 def assistant(state: MessagesState):
-    message = llm_with_tools.invoke([system_message] + state["messages"])
+    message = cascade.invoke([system_message] + state["messages"])
     return {"messages": [message]}
 
 
-from langgraph.graph import START, StateGraph
+from langgraph.graph import START, END, StateGraph
 from langgraph.prebuilt import tools_condition, ToolNode
 from IPython.display import display, Image
 
+## FAST PATH ##
+
+from tools.fast_path import (
+    FastPathRouter,
+    Route,
+    evaluate_arithmetic,
+    format_number,
+    match_arithmetic,
+)
+
+# Pure arithmetic expressions are computed directly with the tools, without the LLM
+USE_FAST_PATH = True
+
+operations = {
+    "add": add,
+    "subtract": subtract,
+    "multiply": multiply,
+    "divide": divide,
+    "exponent": exponent,
+}
+
+
+def answer_arithmetic(expression: str) -> str:
+    """Templated answer for a pure arithmetic expression."""
+    result = evaluate_arithmetic(expression, operations)
+    return f"{expression} = {format_number(result)}"
+
+
+router = FastPathRouter([Route("arithmetic", match_arithmetic, answer_arithmetic)])
+
 # Define the graph
 builder = StateGraph(MessagesState)
 
 # Add nodes
-builder.add_node("assistant", assistant)
+builder.add_node("assistant", router.timed(assistant))
 builder.add_node("tools", ToolNode(tools))
 
 # Add edges: They determine how the control flow moves
-builder.add_edge(START, "assistant")
+if USE_FAST_PATH:
+    builder.add_node("router", router)
+    builder.add_edge(START, "router")
+    builder.add_conditional_edges("router", router.next_node, ["assistant", END])
+else:
+    builder.add_edge(START, "assistant")
 builder.add_conditional_edges("assistant", tools_condition)
 builder.add_edge("tools", "assistant")
 
@@ -159,6 +201,14 @@ result = react_graph_memory.invoke({"messages": messages}, config)
 for m in result["messages"]:
     m.pretty_print()
 
+# A pure expression is answered by the fast path without calling the LLM
+result = react_graph_memory.invoke(
+    {"messages": [HumanMessage(content="(1234+47^2)/123")]}, config
+)
+result["messages"][-1].pretty_print()
+print(router.stats())
+print(cascade.stats())
+
 ## LANGSMITH TRACE ##
 
 import os, getpass
@@ -1,7 +1,7 @@
 from typing import TypedDict, Annotated
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
-from langchain_core.tools import tool
+from langchain_core.tools import ToolException, tool
 from langgraph.graph import StateGraph, END, START
 from langgraph.prebuilt import ToolExecutor, tools_condition, ToolNode
 from langgraph.graph.message import add_messages
@@ -18,7 +18,16 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent.parent
 sys.path.append(str(project_root))
 
-from tools.weather import get_weather as fetch_weather, convert_celsius_to_fahrenheit
+from tools.weather import (
+    get_weather as fetch_weather,
+    get_forecast as fetch_forecast,
+    summarize_forecast,
+    convert_celsius_to_fahrenheit,
+    is_same_city,
+)
+from tools.tool_memo import MemoizedToolNode, merge_memo
+from tools.model_cascade import default_cascade
+from tools.fast_path import FastPathRouter, Route, match_weather
 
 # Load environment variables
 load_dotenv()
@@ -35,9 +44,11 @@ def get_weather(city: str) -> str:
     """Get the weather for a specific city."""
     logger.info(f"🔧 Getting weather for: {city}")
 
+    # The tool output is in English like the other tools; the LLM answers in
+    # the user's language. Spanish names are used by the fast path only.
     result = fetch_weather(city)
     if "error" in result:
-        return f"Sorry, {result['error']}"
+        raise ToolException(f"Sorry, {result['error']}")
 
     temp_c = result["temperature"]
     temp_f = convert_celsius_to_fahrenheit(temp_c)
@@ -47,27 +58,92 @@ def get_weather(city: str) -> str:
     return f"Weather in {city.title()}: {temp_c:.1f}°C ({temp_f:.1f}°F), {condition}, {humidity}% humidity"
 
 
+@tool
+def get_forecast(city: str, days: int = 3) -> str:
+    """Get a day-by-day forecast summary for a specific city (1 to 16 days)."""
+    logger.info(f"🔧 Getting {days}-day forecast for: {city}")
+
+    forecast = fetch_forecast(city, days)
+    if "error" in forecast:
+        raise ToolException(f"Sorry, {forecast['error']}")
+
+    summary = summarize_forecast(forecast)
+    response = f"Forecast for {city.title()}:\n"
+    for day in summary["days"]:
+        temperature = day.get("temperature", {})
+        response += (
+            f"- {day['date']}: {temperature.get('min', '?')}°C to "
+            f"{temperature.get('max', '?')}°C, "
+            f"precipitation {day.get('precipitation_total', 0)} mm "
+            f"({day.get('precipitation_probability_max', '?')}% max chance), "
+            f"wind up to {day.get('wind_speed_max', '?')} km/h\n"
+        )
+    for window in summary["rain_windows"]:
+        response += (
+            f"Rain likely from {window['start']} to {window['end']} "
+            f"({window['max_probability']:.0f}%)\n"
+        )
+
+    return response
+
+
 @tool
 def convert_to_celsius(fahrenheit: float) -> float:
     """Convert a temperature from Fahrenheit to Celsius."""
     return (fahrenheit - 32) * 5 / 9
 
 
-tools = [get_weather, convert_to_celsius]
+tools = [get_weather, get_forecast, convert_to_celsius]
+
+# A ToolException becomes a ToolMessage with the error text and status="error",
+# so the LLM sees the friendly message and the failed call is not memoized
+for t in tools:
+    t.handle_tool_error = True
+
+# How long each tool result can be reused within a thread (None = forever)
+TOOL_MEMO_TTL = {
+    "get_weather": 5 * 60,
+    "get_forecast": 60 * 60,
+}
+
+## FAST PATH ##
+
+# Answer "weather in <city>" directly, without going through the LLM
+USE_FAST_PATH = True
+
+
+def answer_weather(city: str, language: str) -> str | None:
+    """Templated answer for simple weather requests (None falls back to the LLM)."""
+    result = fetch_weather(city, language=language)
+    # Answer only if the geocoder found the city the user wrote, not a
+    # similarly named place ("Nueva York" or a misspelling go to the LLM)
+    if "error" in result or not is_same_city(city, result["location"]):
+        return None
+
+    temp_c = result["temperature"]
+    temp_f = convert_celsius_to_fahrenheit(temp_c)
+    condition = result["condition"]
+    humidity = result["humidity"]
+
+    if language == "es":
+        return f"En {city.title()} hay {temp_c:.1f}°C ({temp_f:.1f}°F), {condition}, con {humidity}% de humedad."
+    return f"Weather in {city.title()}: {temp_c:.1f}°C ({temp_f:.1f}°F), {condition}, {humidity}% humidity."
+
+
+router = FastPathRouter([Route("weather", match_weather, answer_weather)])
 
 ## LLM SETUP ##
 
-# Create the LLM
-llm = ChatOpenAI(
-    model="gpt-3.5-turbo",
-    temperature=0.7,
-)
+# Create the LLMs: a cheap model is tried first and a stronger one is only
+# used when its tool call is invalid
+cascade = default_cascade(tools)
 
 # Create the prompt template
 system_message = SystemMessage(
     content="""You are a helpful weather assistant. Your role is to:
     1. Understand user requests for weather information
     2. Use the get_weather tool to fetch current conditions ONLY for the specific city mentioned
+       and the get_forecast tool when the user asks about the coming days
     3. Respond in a clear, friendly manner
     4. If no city is explicitly mentioned, ask the user which city they're interested in
 
@@ -80,24 +156,24 @@ system_message = SystemMessage(
     Some examples of petitions:
     - "¿Cuántos grados hace en Lima?" -> tool call: get_weather("Lima")
     - "Hoy lloverá en Ayacucho?" -> tool call: get_weather("Ayacucho")
+    - "¿Lloverá en Cusco este fin de semana?" -> tool call: get_forecast("Cusco", 7)
     """
 )
 
-llm_with_tools = llm.bind_tools(tools)
-
 ## GRAPH ##
 
 
 # Define our state
 class AgentState(TypedDict):
     messages: Annotated[list, add_messages]
+    tool_memo: Annotated[dict, merge_memo]
 
 
 # Node
 def assistant(state: AgentState):
     """Agent that processes the user input and returns weather information."""
     messages = state["messages"]
-    message = llm_with_tools.invoke([system_message] + messages)
+    message = cascade.invoke([system_message] + messages)
     return {"messages": [message]}
 
 
@@ -105,11 +181,16 @@ def assistant(state: AgentState):
 builder = StateGraph(AgentState)
 
 # Add nodes
-builder.add_node("assistant", assistant)
-builder.add_node("tools", ToolNode(tools))
+builder.add_node("assistant", router.timed(assistant))
+builder.add_node("tools", MemoizedToolNode(tools, TOOL_MEMO_TTL))
 
 # Add edges
-builder.add_edge(START, "assistant")
+if USE_FAST_PATH:
+    builder.add_node("router", router)
+    builder.add_edge(START, "router")
+    builder.add_conditional_edges("router", router.next_node, ["assistant", END])
+else:
+    builder.add_edge(START, "assistant")
 builder.add_conditional_edges("assistant", tools_condition)
 builder.add_edge("tools", "assistant")
 
@@ -148,3 +229,10 @@ if __name__ == "__main__":
                 m.pretty_print()
             else:
                 print(m)
+
+        # A simple request that the fast path answers without the LLM
+        messages = [HumanMessage(content="¿Cuántos grados hace en Cusco?")]
+        result = weather_graph_memory.invoke({"messages": messages}, config)
+        result["messages"][-1].pretty_print()
+        print(router.stats())
+        print(cascade.stats())
@@ -1,25 +1,63 @@
 import arxiv
+import re
+import threading
+from collections import OrderedDict
 from datetime import datetime
 
+from tools.singleflight import SingleFlight
+
+# Concurrent identical queries share a single upstream call
+inflight_requests = SingleFlight("arxiv")
+
+# A single client keeps arXiv's one request every 3 seconds policy (its
+# built-in delay only applies between requests of the same client); the
+# lock stops threads from racing past that delay
+_client = arxiv.Client()
+_client_lock = threading.Lock()
+
+# Paper metadata does not change for a given id, so lookups are kept (LRU)
+PAPER_CACHE_SIZE = 256
+_paper_cache: "OrderedDict[str, dict]" = OrderedDict()
+_paper_cache_lock = threading.Lock()
+
 
 def search_papers(query: str, max_results: int = 5) -> list:
-    """Search arXiv for papers matching the query."""
-    client = arxiv.Client()
+    """Search arXiv for papers matching the query.
+
+    Concurrent identical searches are coalesced into one request.
+    """
+    key = ("search", " ".join(query.split()), max_results)
+    return inflight_requests.do(key, _search_papers, query, max_results)
+
+
+async def asearch_papers(query: str, max_results: int = 5) -> list:
+    """Async version of search_papers, coalesced with thread and async callers."""
+    key = ("search", " ".join(query.split()), max_results)
+    return await inflight_requests.ado(key, _search_papers, query, max_results)
+
+
+def _search_papers(query: str, max_results: int) -> list:
     search = arxiv.Search(
         query=query, max_results=max_results, sort_by=arxiv.SortCriterion.Relevance
     )
+    with _client_lock:
+        papers = list(_client.results(search))
 
     results = []
-    for paper in client.results(search):
+    for paper in papers:
+        details = _paper_details(paper)
+        # Search results carry every detail, so the usual follow-up
+        # get_paper_by_id on them needs no extra request
+        _cache_paper(details)
         results.append(
             {
-                "title": paper.title,
-                "authors": [author.name for author in paper.authors],
-                "summary": paper.summary,
-                "url": paper.pdf_url,
-                "published": paper.published,
-                "paper_id": paper.entry_id.split("/")[-1],
-                "categories": paper.categories,
+                "title": details["title"],
+                "authors": details["authors"],
+                "summary": details["summary"],
+                "url": details["url"],
+                "published": details["published"],
+                "paper_id": details["paper_id"],
+                "categories": details["categories"],
             }
         )
 
@@ -27,23 +65,71 @@ def search_papers(query: str, max_results: int = 5) -> list:
 
 
 def get_paper_by_id(paper_id: str) -> dict:
-    """Get detailed information about a specific arXiv paper."""
+    """Get detailed information about a specific arXiv paper.
+
+    Successful lookups are cached and concurrent lookups of the same paper
+    are coalesced into one request.
+    """
+    paper_id = paper_id.strip()
+    with _paper_cache_lock:
+        if paper_id in _paper_cache:
+            _paper_cache.move_to_end(paper_id)
+            return _paper_cache[paper_id]
+    return inflight_requests.do(("paper", paper_id), _load_paper, paper_id)
+
+
+async def aget_paper_by_id(paper_id: str) -> dict:
+    """Async version of get_paper_by_id, coalesced with thread and async callers."""
+    paper_id = paper_id.strip()
+    with _paper_cache_lock:
+        if paper_id in _paper_cache:
+            _paper_cache.move_to_end(paper_id)
+            return _paper_cache[paper_id]
+    return await inflight_requests.ado(("paper", paper_id), _load_paper, paper_id)
+
+
+def _load_paper(paper_id: str) -> dict:
+    paper = _get_paper_by_id(paper_id)
+    if "error" not in paper:
+        _cache_paper(paper, paper_id)
+    return paper
+
+
+def _cache_paper(paper: dict, *aliases: str) -> None:
+    """Cache the details of a paper under its versioned id, its id without
+    version (which arXiv resolves to the latest one) and any alias."""
+    paper_id = paper["paper_id"]
+    keys = {paper_id, re.sub(r"v\d+$", "", paper_id), *aliases}
+    with _paper_cache_lock:
+        for key in keys:
+            _paper_cache[key] = paper
+            _paper_cache.move_to_end(key)
+        while len(_paper_cache) > PAPER_CACHE_SIZE:
+            _paper_cache.popitem(last=False)
+
+
+def _get_paper_by_id(paper_id: str) -> dict:
     try:
-        client = arxiv.Client()
         search = arxiv.Search(id_list=[paper_id])
-        paper = next(client.results(search))
-
-        return {
-            "title": paper.title,
-            "authors": [author.name for author in paper.authors],
-            "published": paper.published,
-            "categories": paper.categories,
-            "doi": paper.doi,
-            "summary": paper.summary,
-            "url": paper.pdf_url,
-            "comment": paper.comment,
-            "journal_ref": paper.journal_ref,
-            "primary_category": paper.primary_category,
-        }
+        with _client_lock:
+            paper = next(_client.results(search))
+
+        return _paper_details(paper)
     except Exception as e:
         return {"error": str(e)}
+
+
+def _paper_details(paper: arxiv.Result) -> dict:
+    return {
+        "paper_id": paper.entry_id.split("/")[-1],
+        "title": paper.title,
+        "authors": [author.name for author in paper.authors],
+        "published": paper.published,
+        "categories": paper.categories,
+        "doi": paper.doi,
+        "summary": paper.summary,
+        "url": paper.pdf_url,
+        "comment": paper.comment,
+        "journal_ref": paper.journal_ref,
+        "primary_category": paper.primary_category,
+    }
@@ -0,0 +1,224 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import requests
+from langchain_chroma import Chroma
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pypdf import PdfReader
+
+from tools.arxiv import get_paper_by_id
+from tools.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# PDFs and the vector store live here, shared by every run
+CACHE_DIR = Path(
+    os.getenv(
+        "ARXIV_CACHE_DIR", Path.home() / ".cache" / "agentic-patterns-es" / "arxiv"
+    )
+)
+COLLECTION_NAME = "arxiv_papers"
+
+# Pages extracted by each worker process
+PAGES_PER_TASK = 8
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 150
+
+
+def _extract_pages(path: str, start: int, end: int) -> List[str]:
+    """Extract the text of pages [start, end) of a PDF (runs in a worker process)."""
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+class PaperIndex:
+    """Full-text index of arXiv papers.
+
+    Each PDF is downloaded once into a content-addressed cache
+    (``<sha256>.pdf``), its text is extracted in a process pool, and the
+    chunks are embedded into a persistent Chroma collection so questions
+    only bring back the few passages that matter.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = CACHE_DIR,
+        embeddings: Optional[Embeddings] = None,
+        max_workers: Optional[int] = None,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.pdf_dir = self.cache_dir / "pdfs"
+        self.pdf_dir.mkdir(parents=True, exist_ok=True)
+        self._manifest_path = self.cache_dir / "manifest.json"
+        # paper_id -> {"sha256": digest of the PDF, "indexed": all chunks stored}
+        self._manifest: Dict[str, Dict[str, Any]] = (
+            json.loads(self._manifest_path.read_text())
+            if self._manifest_path.exists()
+            else {}
+        )
+        self._lock = threading.Lock()
+        self._inflight = SingleFlight("arxiv-pdf")
+        self._max_workers = max_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._splitter = RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+        )
+        self.vectorstore = Chroma(
+            collection_name=COLLECTION_NAME,
+            embedding_function=embeddings or OpenAIEmbeddings(),
+            persist_directory=str(self.cache_dir / "chroma"),
+        )
+
+    def resolve_id(self, paper_id: str) -> str:
+        """Return the versioned id arXiv reports for a paper.
+
+        "2210.03629" and "2210.03629v3" resolve to the same id, so a paper is
+        only downloaded and embedded once whichever form the LLM uses.
+        """
+        paper_id = paper_id.strip()
+        with self._lock:
+            # Only resolved ids are stored in the manifest
+            if paper_id in self._manifest:
+                return paper_id
+        paper = get_paper_by_id(paper_id)
+        if "error" in paper:
+            raise ValueError(f"Could not find paper {paper_id}: {paper['error']}")
+        return paper["paper_id"]
+
+    def pdf_path(self, paper_id: str) -> Path:
+        """Return the cached PDF of a paper, downloading it the first time."""
+        with self._lock:
+            entry = self._manifest.get(paper_id)
+        if entry is not None:
+            path = self.pdf_dir / f"{entry['sha256']}.pdf"
+            if path.exists():
+                return path
+        return self._inflight.do(("download", paper_id), self._download, paper_id)
+
+    def _download(self, paper_id: str) -> Path:
+        paper = get_paper_by_id(paper_id)
+        if "error" in paper:
+            raise ValueError(f"Could not find paper {paper_id}: {paper['error']}")
+
+        logger.info(f"📥 Downloading PDF for paper: {paper_id}")
+        response = requests.get(paper["url"], timeout=60)
+        response.raise_for_status()
+
+        digest = hashlib.sha256(response.content).hexdigest()
+        path = self.pdf_dir / f"{digest}.pdf"
+        if not path.exists():
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(response.content)
+            os.replace(tmp_path, path)
+
+        self._update_manifest(paper_id, sha256=digest, indexed=False)
+        return path
+
+    def _update_manifest(self, paper_id: str, **fields: Any) -> None:
+        with self._lock:
+            self._manifest.setdefault(paper_id, {}).update(fields)
+            tmp_manifest = self._manifest_path.with_suffix(".tmp")
+            tmp_manifest.write_text(json.dumps(self._manifest, indent=2))
+            os.replace(tmp_manifest, self._manifest_path)
+
+    def extract_text(self, path: Path) -> List[str]:
+        """Extract the text of every page, spreading page ranges over worker processes."""
+        num_pages = len(PdfReader(str(path)).pages)
+        with self._lock:
+            if self._pool is None:
+                # Forking a process that already runs threads (LangGraph,
+                # Chroma, prefetching) can deadlock the children
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self._max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            pool = self._pool
+
+        futures = [
+            pool.submit(
+                _extract_pages, str(path), start, min(start + PAGES_PER_TASK, num_pages)
+            )
+            for start in range(0, num_pages, PAGES_PER_TASK)
+        ]
+        return [page for future in futures for page in future.result()]
+
+    def is_indexed(self, paper_id: str) -> bool:
+        """Check whether every chunk of a paper was stored in the vector store.
+
+        The flag is only written after the chunks are added, so a paper whose
+        indexing failed halfway is indexed again on the next request.
+        """
+        with self._lock:
+            return self._manifest.get(paper_id, {}).get("indexed", False)
+
+    def index_paper(self, paper_id: str) -> int:
+        """Download, extract, chunk and embed a paper. Returns the number of new chunks."""
+        paper_id = self.resolve_id(paper_id)
+        if self.is_indexed(paper_id):
+            return 0
+        return self._inflight.do(("index", paper_id), self._index, paper_id)
+
+    def _index(self, paper_id: str) -> int:
+        pages = self.extract_text(self.pdf_path(paper_id))
+        documents = self._splitter.create_documents(
+            pages,
+            metadatas=[
+                {"paper_id": paper_id, "page": number}
+                for number in range(1, len(pages) + 1)
+            ],
+        )
+        # Drop chunks left by a failed or previous run, which may have had more
+        self.vectorstore.delete(where={"paper_id": paper_id})
+        if documents:
+            logger.info(f"🧩 Indexing {len(documents)} chunks for paper: {paper_id}")
+            self.vectorstore.add_documents(
+                documents, ids=[f"{paper_id}:{i}" for i in range(len(documents))]
+            )
+        self._update_manifest(paper_id, indexed=True)
+        return len(documents)
+
+    def search(self, paper_id: str, question: str, k: int = 4) -> List[Dict]:
+        """Return the ``k`` chunks of a paper that best match the question."""
+        paper_id = self.resolve_id(paper_id)
+        self.index_paper(paper_id)
+        documents = self.vectorstore.similarity_search(
+            question, k=k, filter={"paper_id": paper_id}
+        )
+        return [
+            {"page": document.metadata.get("page"), "content": document.page_content}
+            for document in documents
+        ]
+
+    def close(self) -> None:
+        """Shut down the worker processes."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+_paper_index: Optional[PaperIndex] = None
+_paper_index_lock = threading.Lock()
+
+
+def get_paper_index() -> PaperIndex:
+    """Return the shared PaperIndex, creating it on first use."""
+    global _paper_index
+    with _paper_index_lock:
+        if _paper_index is None:
+            _paper_index = PaperIndex()
+        return _paper_index
+
+
+def search_paper_content(paper_id: str, question: str, k: int = 4) -> List[Dict]:
+    """Search the full text of an arXiv paper and return the top matching chunks."""
+    return get_paper_index().search(paper_id, question, k)
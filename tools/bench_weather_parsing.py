@@ -0,0 +1,92 @@
+"""Micro-benchmark for the Open-Meteo response parsing in tools.weather.
+
+Compares the previous approach (decode the whole response with json and
+rebuild the weather code table on every call) with the current one
+(module-level table and parse_current), reporting both the orjson and the
+standard library decoders. Run from the project root:
+
+    python -m tools.bench_weather_parsing
+"""
+
+import json
+import timeit
+import tracemalloc
+
+from tools.weather import (
+    _CURRENT_FIELDS,
+    WEATHER_CONDITIONS,
+    _decode_current_orjson,
+    _decode_current_stdlib,
+    orjson,
+)
+
+# Shape of a real `current` response from Open-Meteo
+SAMPLE_RESPONSE = json.dumps(
+    {
+        "latitude": -12.0,
+        "longitude": -77.0,
+        "generationtime_ms": 0.03,
+        "utc_offset_seconds": -18000,
+        "timezone": "America/Lima",
+        "timezone_abbreviation": "-05",
+        "elevation": 154.0,
+        "current_units": {
+            "time": "iso8601",
+            "interval": "seconds",
+            "temperature_2m": "°C",
+            "relative_humidity_2m": "%",
+            "weather_code": "wmo code",
+        },
+        "current": {
+            "time": "2024-11-20T10:15",
+            "interval": 900,
+            "temperature_2m": 19.4,
+            "relative_humidity_2m": 78,
+            "weather_code": 3,
+        },
+    },
+    separators=(",", ":"),
+).encode("utf-8")
+
+
+def baseline(body: bytes) -> str:
+    data = json.loads(body.decode("utf-8"))
+    weather_codes = {code: name for code, name in WEATHER_CONDITIONS["en"].items()}
+    current = data["current"]
+    return weather_codes.get(current["weather_code"], "unknown")
+
+
+def fast_path(decode):
+    def parse(body: bytes) -> str:
+        current = decode(body)
+        fields = {name: current[name] for name in _CURRENT_FIELDS}
+        return WEATHER_CONDITIONS["en"].get(fields["weather_code"], "unknown")
+
+    return parse
+
+
+def measure(fn, number: int = 100_000) -> tuple[float, int]:
+    """Return microseconds per call and peak bytes allocated by one call."""
+    seconds = min(timeit.repeat(lambda: fn(SAMPLE_RESPONSE), number=number, repeat=3))
+
+    tracemalloc.start()
+    fn(SAMPLE_RESPONSE)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return seconds / number * 1e6, peak
+
+
+if __name__ == "__main__":
+    candidates = [
+        ("baseline", baseline),
+        ("stdlib", fast_path(_decode_current_stdlib)),
+    ]
+    if orjson is not None:
+        candidates.append(("orjson", fast_path(_decode_current_orjson)))
+    else:
+        print("orjson is not installed, skipping its measurement")
+
+    for name, fn in candidates:
+        micros, peak = measure(fn)
+        print(f"{name:>10}: {micros:6.2f} µs/call, {peak:6d} bytes peak")
@@ -0,0 +1,281 @@
+import ast
+import functools
+import logging
+import math
+import operator
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Mapping, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END
+
+logger = logging.getLogger(__name__)
+
+# A fast-path answer replaces the tool-selection call and the answer call
+LLM_CALLS_SAVED = 2
+
+## CLASSIFIERS ##
+
+_ARITHMETIC_PREFIX = re.compile(
+    r"^\s*(?:¿\s*)?(?:cu[aá]nto es|calcula|what is|what's|compute|calculate)?\s*",
+    re.IGNORECASE,
+)
+_ARITHMETIC_EXPRESSION = re.compile(r"^[\d\s+\-*/^().]+$")
+_MAX_EXPONENT = 100
+# Larger results (e.g. nested powers) are left to the LLM
+_MAX_RESULT_BITS = 4096
+
+# Names match the calculator tools
+DEFAULT_OPERATIONS: Mapping[str, Callable] = {
+    "add": operator.add,
+    "subtract": operator.sub,
+    "multiply": operator.mul,
+    "divide": operator.truediv,
+    "exponent": operator.pow,
+}
+_BINARY_OPERATIONS = {
+    ast.Add: "add",
+    ast.Sub: "subtract",
+    ast.Mult: "multiply",
+    ast.Div: "divide",
+    ast.Pow: "exponent",
+}
+
+
+def match_arithmetic(text: str) -> Optional[Tuple[str]]:
+    """Recognize a message that is only an arithmetic expression."""
+    expression = _ARITHMETIC_PREFIX.sub("", text).strip().rstrip("?=").strip()
+    if not _ARITHMETIC_EXPRESSION.match(expression):
+        return None
+    if not re.search(r"\d", expression) or not re.search(r"[+\-*/^]", expression):
+        return None
+    return (expression,)
+
+
+def evaluate_arithmetic(
+    expression: str, operations: Mapping[str, Callable] = DEFAULT_OPERATIONS
+) -> float:
+    """Evaluate an arithmetic expression with the given operations.
+
+    Only numbers, parentheses and + - * / ^ are accepted; anything else,
+    or a result too large to compute quickly, raises ValueError.
+    """
+
+    def evaluate(node: ast.AST) -> float:
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return node.value
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+            value = evaluate(node.operand)
+            return -value if isinstance(node.op, ast.USub) else value
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATIONS:
+            left, right = evaluate(node.left), evaluate(node.right)
+            if isinstance(node.op, ast.Pow):
+                _check_power(left, right)
+            result = operations[_BINARY_OPERATIONS[type(node.op)]](left, right)
+            if isinstance(result, complex):
+                raise ValueError(f"Complex result: {result}")
+            if isinstance(result, int) and result.bit_length() > _MAX_RESULT_BITS:
+                raise ValueError("Result too large")
+            return result
+        raise ValueError(f"Unsupported expression: {ast.dump(node)}")
+
+    try:
+        tree = ast.parse(expression.replace("^", "**"), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(str(e)) from e
+    return evaluate(tree.body)
+
+
+def _check_power(base: float, exponent: float) -> None:
+    """Reject powers whose result would be too large, before computing them."""
+    if abs(exponent) > _MAX_EXPONENT:
+        raise ValueError(f"Exponent too large: {exponent}")
+    if abs(base) > 1 and exponent > 0:
+        if math.log2(abs(base)) * exponent > _MAX_RESULT_BITS:
+            raise ValueError("Result too large")
+
+
+def format_number(value: float) -> str:
+    """Format a result exactly: integers without decimals, floats without
+    the rounding noise of binary arithmetic."""
+    if isinstance(value, int):
+        return str(value)
+    if value.is_integer() and abs(value) < 2**53:
+        return str(int(value))
+    return repr(round(value, 10))
+
+
+# Up to four words made of letters, e.g. "Lima", "San Juan de Lurigancho"
+_CITY = r"(?P<city>[^\W\d_][^\W\d_'-]*(?:[ '-][^\W\d_][^\W\d_'-]*){0,3}?)"
+_END = r"\s*[?.!]*\s*$"
+# Captures starting with an article or possessive are not city names
+# ("the beach", "mi ciudad"); cities like "La Paz" are left to the LLM
+_NOT_CITY_FIRST_WORDS = frozenset(
+    "the a an my your our his her their this that "
+    "el la los las un una mi mis tu tus su sus nuestro nuestra este esta".split()
+)
+# Words that mean the request is about several cities, another day or no
+# city at all ("Lima y Cusco", "Lima el sábado", "Paris in July", "in general")
+_NOT_CITY_WORDS = frozenset(
+    "y and general "
+    "today tonight tomorrow yesterday week weekend month year "
+    "hoy noche mañana ayer semana fin mes año "
+    "monday tuesday wednesday thursday friday saturday sunday "
+    "lunes martes miércoles miercoles jueves viernes sábado sabado domingo "
+    "january february march april may june july august september october "
+    "november december enero febrero marzo abril mayo junio julio agosto "
+    "septiembre setiembre octubre noviembre diciembre".split()
+)
+
+_WEATHER_PATTERNS = [
+    (
+        re.compile(
+            r"^\s*(?:(?:what(?:'s| is)|how(?:'s| is)) the )?(?:current )?"
+            rf"(?:weather|temperature) (?:in|for|at) {_CITY}"
+            rf"(?: (?:today|now|right now))?{_END}",
+            re.IGNORECASE,
+        ),
+        "en",
+    ),
+    (
+        re.compile(
+            r"^\s*(?:¿\s*)?(?:(?:c[oó]mo est[aá]|qu[eé]|cu[aá]l es) (?:el|la) )?"
+            rf"(?:clima|tiempo|temperatura) (?:actual )?(?:en|de|para) {_CITY}"
+            rf"(?: (?:hoy|ahora))?{_END}",
+            re.IGNORECASE,
+        ),
+        "es",
+    ),
+    (
+        re.compile(
+            rf"^\s*(?:¿\s*)?cu[aá]ntos grados hace (?:hoy )?en {_CITY}"
+            rf"(?: (?:hoy|ahora))?{_END}",
+            re.IGNORECASE,
+        ),
+        "es",
+    ),
+]
+
+
+def match_weather(text: str) -> Optional[Tuple[str, str]]:
+    """Recognize "weather in <city>" requests in English or Spanish.
+
+    Returns the city and the language of the request. Only the city name
+    can follow the preposition; anything that looks like a date, a second
+    city or a common noun is left to the LLM. The answer should still
+    check that the geocoder found that same city.
+    """
+    for pattern, language in _WEATHER_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            city = match.group("city")
+            words = city.lower().split()
+            if words[0] in _NOT_CITY_FIRST_WORDS or _NOT_CITY_WORDS.intersection(words):
+                return None
+            return (city, language)
+    return None
+
+
+## ROUTER ##
+
+
+class Route:
+    """A fast-path route: ``match`` extracts arguments from the user message
+    and ``answer`` turns them into the final reply (or None to give up)."""
+
+    def __init__(
+        self,
+        name: str,
+        match: Callable[[str], Optional[Tuple]],
+        answer: Callable[..., Optional[str]],
+    ):
+        self.name = name
+        self.match = match
+        self.answer = answer
+
+
+class FastPathRouter:
+    """Graph node that answers trivially structured requests without the LLM.
+
+    Add it before the assistant node and use :meth:`next_node` as its
+    conditional edge: when a route answers, the graph ends; otherwise the
+    message goes to the LLM as usual. Wrap the LLM node with :meth:`timed`
+    to estimate how much latency the fast path saves.
+    """
+
+    def __init__(self, routes: Sequence[Route], fallback: str = "assistant"):
+        self.routes = list(routes)
+        self.fallback = fallback
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._hits: Dict[str, int] = {route.name: 0 for route in self.routes}
+        self._fast_seconds = 0.0
+        self._llm_calls = 0
+        self._llm_seconds = 0.0
+
+    def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        message = state["messages"][-1]
+        if not isinstance(message, HumanMessage):
+            return {}
+
+        start = time.perf_counter()
+        for route in self.routes:
+            args = route.match(message.content)
+            if args is None:
+                continue
+            try:
+                answer = route.answer(*args)
+            except Exception as e:
+                logger.warning(f"Fast path '{route.name}' failed: {str(e)}")
+                answer = None
+            if answer is None:
+                continue
+
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._requests += 1
+                self._hits[route.name] += 1
+                self._fast_seconds += elapsed
+            logger.info(f"⚡ Fast path '{route.name}' answered in {elapsed * 1000:.1f} ms")
+            return {"messages": [AIMessage(content=answer)]}
+
+        with self._lock:
+            self._requests += 1
+        return {}
+
+    def next_node(self, state: Dict[str, Any]) -> str:
+        """Conditional edge: end if the fast path answered, else go to the LLM."""
+        return END if isinstance(state["messages"][-1], AIMessage) else self.fallback
+
+    def timed(self, node: Callable) -> Callable:
+        """Wrap an LLM node to measure its latency."""
+
+        @functools.wraps(node)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return node(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._llm_calls += 1
+                    self._llm_seconds += time.perf_counter() - start
+
+        return wrapper
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the fast-path hit rate and the estimated latency saved."""
+        with self._lock:
+            hits = sum(self._hits.values())
+            avg_llm = self._llm_seconds / self._llm_calls if self._llm_calls else 0.0
+            return {
+                "requests": self._requests,
+                "hits": hits,
+                "hits_by_route": dict(self._hits),
+                "hit_rate": hits / self._requests if self._requests else 0.0,
+                "avg_llm_seconds": avg_llm,
+                "saved_seconds": max(
+                    0.0, hits * LLM_CALLS_SAVED * avg_llm - self._fast_seconds
+                ),
+            }
@@ -0,0 +1,218 @@
+import logging
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.tools import BaseTool, StructuredTool
+from langchain_openai import ChatOpenAI
+
+logger = logging.getLogger(__name__)
+
+# Models used by default_cascade: a cheap one first, a stronger one when needed
+SMALL_MODEL = os.getenv("CASCADE_SMALL_MODEL", "gpt-4o-mini")
+LARGE_MODEL = os.getenv("CASCADE_LARGE_MODEL", "gpt-4o")
+# Escalate text answers whose confidence is below this. Off until a threshold
+# is measured on real traffic (see the "confidence" entries of stats())
+DEFAULT_MIN_CONFIDENCE = 0.0
+
+# USD per million input/output tokens; unknown models are counted as free
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+
+def logprob_confidence(message: AIMessage) -> float:
+    """Geometric mean of the token probabilities of a response, or 1.0 when
+    no logprobs are available.
+
+    Enable logprobs on the model (e.g. ``ChatOpenAI(logprobs=True)``) for
+    this to have any effect. OpenAI only returns logprobs for text content,
+    so it says nothing about tool calls.
+    """
+    logprobs = (message.response_metadata.get("logprobs") or {}).get("content")
+    if not logprobs:
+        return 1.0
+    return math.exp(sum(token["logprob"] for token in logprobs) / len(logprobs))
+
+
+class ModelTier:
+    """A model of the cascade and its price in USD per million tokens."""
+
+    def __init__(
+        self,
+        name: str,
+        llm: BaseChatModel,
+        input_cost_per_million: float = 0.0,
+        output_cost_per_million: float = 0.0,
+    ):
+        self.name = name
+        self.llm = llm
+        self.input_cost_per_million = input_cost_per_million
+        self.output_cost_per_million = output_cost_per_million
+
+
+class ModelCascade:
+    """Try cheap models first and escalate only when their answer is not good enough.
+
+    Each tier is called in order with the tools bound. A response with
+    tool calls is accepted when they all name a known tool with valid
+    arguments; a text answer is accepted when ``confidence(message)``
+    reaches ``min_confidence``. Otherwise the next tier is tried. The last
+    tier is always accepted. Latency, tokens, cost and the confidence of
+    text answers are tracked per tier, to choose ``min_confidence``.
+    """
+
+    def __init__(
+        self,
+        tiers: Sequence[ModelTier],
+        tools: Sequence[Any],
+        min_confidence: float = 0.0,
+        confidence: Callable[[AIMessage], float] = logprob_confidence,
+    ):
+        if not tiers:
+            raise ValueError("A cascade needs at least one model tier")
+
+        self.tiers = list(tiers)
+        self.tools: Dict[str, BaseTool] = {}
+        for tool in tools:
+            if not isinstance(tool, BaseTool):
+                tool = StructuredTool.from_function(tool)
+            self.tools[tool.name] = tool
+        self.min_confidence = min_confidence
+        self.confidence = confidence
+        self._bound = [tier.llm.bind_tools(list(self.tools.values())) for tier in self.tiers]
+        self._lock = threading.Lock()
+        self._stats = {
+            tier.name: {
+                "calls": 0,
+                "accepted": 0,
+                "escalated": 0,
+                "seconds": 0.0,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "cost": 0.0,
+                "text_answers": 0,
+                "confidence_sum": 0.0,
+                "confidence_min": 1.0,
+            }
+            for tier in self.tiers
+        }
+
+    def validate(self, message: AIMessage) -> Optional[str]:
+        """Return why a response cannot be used, or None if it is valid."""
+        if message.invalid_tool_calls:
+            return "malformed tool call"
+        for call in message.tool_calls:
+            tool = self.tools.get(call["name"])
+            if tool is None:
+                return f"unknown tool {call['name']}"
+            schema = tool.args_schema
+            validate = getattr(schema, "model_validate", None) or schema.parse_obj
+            try:
+                validate(call["args"])
+            except Exception as e:
+                return f"invalid arguments for {call['name']}: {str(e)}"
+        return None
+
+    def invoke(self, messages: List[BaseMessage]) -> AIMessage:
+        """Run the cascade and return the first acceptable response."""
+        last = len(self.tiers) - 1
+        for i, (tier, llm) in enumerate(zip(self.tiers, self._bound)):
+            start = time.perf_counter()
+            message = llm.invoke(messages)
+            self._record(tier, message, time.perf_counter() - start)
+
+            if i == last:
+                break
+            if message.tool_calls or message.invalid_tool_calls:
+                reason = self.validate(message)
+            else:
+                confidence = self.confidence(message)
+                self._record_confidence(tier, confidence)
+                reason = None
+                if confidence < self.min_confidence:
+                    reason = f"low confidence ({confidence:.2f})"
+            if reason is None:
+                break
+
+            logger.info(f"⤴️ Escalating from {tier.name}: {reason}")
+            with self._lock:
+                self._stats[tier.name]["escalated"] += 1
+
+        with self._lock:
+            self._stats[tier.name]["accepted"] += 1
+        return message
+
+    def _record(self, tier: ModelTier, message: AIMessage, seconds: float) -> None:
+        usage = message.usage_metadata or {}
+        input_tokens = usage.get("input_tokens", 0)
+        output_tokens = usage.get("output_tokens", 0)
+        with self._lock:
+            stats = self._stats[tier.name]
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            stats["input_tokens"] += input_tokens
+            stats["output_tokens"] += output_tokens
+            stats["cost"] += (
+                input_tokens * tier.input_cost_per_million
+                + output_tokens * tier.output_cost_per_million
+            ) / 1_000_000
+
+    def _record_confidence(self, tier: ModelTier, confidence: float) -> None:
+        with self._lock:
+            stats = self._stats[tier.name]
+            stats["text_answers"] += 1
+            stats["confidence_sum"] += confidence
+            stats["confidence_min"] = min(stats["confidence_min"], confidence)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return calls, acceptances, escalations, latency, tokens, cost and
+        the confidence of text answers per tier."""
+        with self._lock:
+            result = {}
+            for name, stats in self._stats.items():
+                stats = dict(stats)
+                answers = stats.pop("text_answers")
+                total = stats.pop("confidence_sum")
+                lowest = stats.pop("confidence_min")
+                stats["confidence"] = {
+                    "answers": answers,
+                    "mean": total / answers if answers else None,
+                    "min": lowest if answers else None,
+                }
+                result[name] = stats
+            return result
+
+
+def default_cascade(
+    tools: Sequence[Any],
+    temperature: float = 0.7,
+    min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+) -> ModelCascade:
+    """Two-tier OpenAI cascade used by the agents of this repository.
+
+    The small tier returns logprobs so the confidence of its text answers is
+    measured; set ``min_confidence`` to escalate the low-confidence ones.
+    """
+    return ModelCascade(
+        [
+            ModelTier(
+                "small",
+                ChatOpenAI(model=SMALL_MODEL, temperature=temperature, logprobs=True),
+                *MODEL_PRICES.get(SMALL_MODEL, (0.0, 0.0)),
+            ),
+            ModelTier(
+                "large",
+                ChatOpenAI(model=LARGE_MODEL, temperature=temperature),
+                *MODEL_PRICES.get(LARGE_MODEL, (0.0, 0.0)),
+            ),
+        ],
+        tools,
+        min_confidence=min_confidence,
+    )
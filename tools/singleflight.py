@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Any, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """A single in-flight execution shared by every caller with the same key."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapse concurrent identical calls into a single upstream request.
+
+    While a call for ``key`` is running, any other caller asking for the same
+    key (from another thread or another coroutine) waits for it and receives
+    the same result, or the same exception. Results are shared between
+    callers, so treat them as read-only.
+    """
+
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Task]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._calls_total = 0
+        self._executions = 0
+        self._collapsed = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` unless an identical call is already running."""
+        with self._lock:
+            self._calls_total += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._executions += 1
+            else:
+                self._collapsed += 1
+
+        if not leader:
+            logger.debug(f"[{self.name}] Joining in-flight call for {key!r}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def ado(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Async variant of :meth:`do` for blocking functions.
+
+        Coroutines on the same event loop wait on a shared task that runs
+        ``fn`` in a worker thread through :meth:`do`, so it is also coalesced
+        with calls coming from plain threads. Cancelling one caller only
+        cancels its own wait; the others still get the result.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pending = self._async_calls.setdefault(loop, {})
+            task = pending.get(key)
+            if task is not None:
+                self._calls_total += 1
+                self._collapsed += 1
+
+        if task is not None:
+            logger.debug(f"[{self.name}] Joining in-flight call for {key!r}")
+        else:
+            task = loop.create_task(asyncio.to_thread(self.do, key, fn, *args, **kwargs))
+            pending[key] = task
+            task.add_done_callback(lambda t: self._forget_task(pending, key, t))
+
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _forget_task(
+        pending: Dict[Hashable, asyncio.Task], key: Hashable, task: asyncio.Task
+    ) -> None:
+        if pending.get(key) is task:
+            del pending[key]
+        # Mark the exception as retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Return how many calls were made, executed upstream and collapsed."""
+        with self._lock:
+            return {
+                "calls": self._calls_total,
+                "executions": self._executions,
+                "collapsed": self._collapsed,
+                "in_flight": len(self._calls),
+            }
+
+    def reset_stats(self) -> None:
+        """Reset the call counters (in-flight calls are not affected)."""
+        with self._lock:
+            self._calls_total = 0
+            self._executions = 0
+            self._collapsed = 0
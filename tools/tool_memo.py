@@ -0,0 +1,102 @@
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.prebuilt import ToolNode
+
+logger = logging.getLogger(__name__)
+
+
+def merge_memo(left: Optional[Dict], right: Optional[Dict]) -> Dict:
+    """Reducer for the ``tool_memo`` state key.
+
+    Newer entries replace older ones and entries set to None are removed.
+    """
+    merged = {**(left or {}), **(right or {})}
+    return {key: entry for key, entry in merged.items() if entry is not None}
+
+
+def memo_key(name: str, args: Dict[str, Any]) -> str:
+    """Build the memo key of a tool call from its name and arguments."""
+    return f"{name}:{json.dumps(args, sort_keys=True, default=str)}"
+
+
+class MemoizedToolNode:
+    """ToolNode that reuses results already obtained in the same thread.
+
+    Results are stored in the ``tool_memo`` key of the graph state, so they
+    are saved with the checkpoint of each thread. ``ttl`` maps tool names to
+    how many seconds a result stays fresh (``None`` means forever); tools
+    that are not listed are always executed. Only successful calls are
+    memoized, so tools must report failures by raising ``ToolException``
+    with ``handle_tool_error=True`` set, which returns the error text in a
+    message with ``status="error"``. Expired entries are pruned from the
+    state on every call.
+
+    The state must declare ``tool_memo: Annotated[dict, merge_memo]``.
+    """
+
+    def __init__(
+        self,
+        tools: Sequence[Callable],
+        ttl: Dict[str, Optional[float]],
+        clock: Callable[[], float] = time.time,
+    ):
+        self.tool_node = ToolNode(tools)
+        self.ttl = ttl
+        self._clock = clock
+
+    def _is_fresh(self, name: str, entry: Dict[str, Any], now: float) -> bool:
+        ttl = self.ttl[name]
+        return ttl is None or now - entry["at"] < ttl
+
+    def __call__(
+        self, state: Dict[str, Any], config: Optional[RunnableConfig] = None
+    ) -> Dict[str, Any]:
+        tool_calls = state["messages"][-1].tool_calls
+        memo = state.get("tool_memo") or {}
+        now = self._clock()
+
+        results: Dict[str, ToolMessage] = {}
+        pending: List[Dict[str, Any]] = []
+        for call in tool_calls:
+            entry = None
+            if call["name"] in self.ttl:
+                entry = memo.get(memo_key(call["name"], call["args"]))
+            if entry is not None and self._is_fresh(call["name"], entry, now):
+                logger.info(f"♻️ Reusing previous result of {call['name']}")
+                results[call["id"]] = ToolMessage(
+                    content=entry["content"], name=call["name"], tool_call_id=call["id"]
+                )
+            else:
+                pending.append(call)
+
+        # Drop expired entries and those of tools that are no longer memoized
+        updates: Dict[str, Optional[Dict[str, Any]]] = {}
+        for key, entry in memo.items():
+            name = key.split(":", 1)[0]
+            if name not in self.ttl or not self._is_fresh(name, entry, now):
+                updates[key] = None
+
+        if pending:
+            output = self.tool_node.invoke(
+                {"messages": [AIMessage(content="", tool_calls=pending)]}, config
+            )
+            calls_by_id = {call["id"]: call for call in pending}
+            for message in output["messages"]:
+                results[message.tool_call_id] = message
+                call = calls_by_id[message.tool_call_id]
+                status = getattr(message, "status", "success")
+                if call["name"] in self.ttl and status != "error":
+                    updates[memo_key(call["name"], call["args"])] = {
+                        "content": message.content,
+                        "at": now,
+                    }
+
+        return {
+            "messages": [results[call["id"]] for call in tool_calls],
+            "tool_memo": updates,
+        }
@@ -1,14 +1,132 @@
 import requests
-from typing import Optional, Dict, Any
+from array import array
+from datetime import datetime, timezone
+from types import MappingProxyType
+from typing import Callable, Optional, Dict, Any, List, Mapping, Sequence, Tuple
+import json
 import logging
+import math
+import threading
+import time
+import unicodedata
+
+try:
+    import orjson
+except ImportError:  # optional, only used to speed up response parsing
+    orjson = None
+
+from tools.singleflight import SingleFlight
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(message)s")
 logger = logging.getLogger(__name__)
 
+# Concurrent requests for the same city share a single upstream call
+inflight_requests = SingleFlight("weather")
+
+# Open-Meteo refreshes the `current` values every 15 minutes
+UPDATE_INTERVAL_SECONDS = 900
+# Small delay after each boundary before the new values are requested
+UPDATE_GRACE_SECONDS = 30
+
+# WMO weather codes returned by Open-Meteo, by language
+WEATHER_CONDITIONS: Mapping[str, Mapping[int, str]] = MappingProxyType(
+    {
+        "en": MappingProxyType(
+            {
+                0: "clear sky",
+                1: "mainly clear",
+                2: "partly cloudy",
+                3: "overcast",
+                45: "foggy",
+                48: "depositing rime fog",
+                51: "light drizzle",
+                53: "moderate drizzle",
+                55: "dense drizzle",
+                61: "slight rain",
+                63: "moderate rain",
+                65: "heavy rain",
+                71: "slight snow fall",
+                73: "moderate snow fall",
+                75: "heavy snow fall",
+                77: "snow grains",
+                80: "slight rain showers",
+                81: "moderate rain showers",
+                82: "violent rain showers",
+                85: "slight snow showers",
+                86: "heavy snow showers",
+                95: "thunderstorm",
+                96: "thunderstorm with slight hail",
+                99: "thunderstorm with heavy hail",
+            }
+        ),
+        "es": MappingProxyType(
+            {
+                0: "cielo despejado",
+                1: "mayormente despejado",
+                2: "parcialmente nublado",
+                3: "nublado",
+                45: "niebla",
+                48: "niebla con escarcha",
+                51: "llovizna ligera",
+                53: "llovizna moderada",
+                55: "llovizna densa",
+                61: "lluvia ligera",
+                63: "lluvia moderada",
+                65: "lluvia intensa",
+                71: "nevada ligera",
+                73: "nevada moderada",
+                75: "nevada intensa",
+                77: "granos de nieve",
+                80: "chubascos ligeros",
+                81: "chubascos moderados",
+                82: "chubascos violentos",
+                85: "chubascos de nieve ligeros",
+                86: "chubascos de nieve intensos",
+                95: "tormenta eléctrica",
+                96: "tormenta con granizo ligero",
+                99: "tormenta con granizo fuerte",
+            }
+        ),
+    }
+)
+UNKNOWN_CONDITION: Mapping[str, str] = MappingProxyType(
+    {"en": "unknown", "es": "desconocido"}
+)
+
+_CURRENT_FIELDS = ("temperature_2m", "relative_humidity_2m", "weather_code")
+_CURRENT_MARKER = '"current":'
+_json_decoder = json.JSONDecoder()
+
+# Variables requested by get_forecast unless others are given. Daily
+# min/max/totals are computed from the hourly series by summarize_forecast,
+# so only what cannot be derived from them is requested per day.
+FORECAST_HOURLY_VARIABLES = (
+    "temperature_2m",
+    "precipitation",
+    "precipitation_probability",
+    "wind_speed_10m",
+)
+FORECAST_DAILY_VARIABLES = ("precipitation_probability_max",)
+
+# Cities do not move, so successful geocoding lookups are kept forever
+_location_cache: Dict[str, Dict[str, Any]] = {}
+
 
 def get_coordinates(city: str) -> Optional[tuple[float, float]]:
     """Get coordinates for a city using Open-Meteo Geocoding API."""
+    location = get_location(city)
+    if location is None:
+        return None
+    return location["latitude"], location["longitude"]
+
+
+def get_location(city: str) -> Optional[Dict[str, Any]]:
+    """Get the name and coordinates of the place the geocoder matches for a city."""
+    key = _city_key(city)
+    if key in _location_cache:
+        return _location_cache[key]
+
     try:
         response = requests.get(
             f"https://geocoding-api.open-meteo.com/v1/search",
@@ -22,73 +140,70 @@ def get_coordinates(city: str) -> Optional[tuple[float, float]]:
             return None
 
         result = data["results"][0]
-        return (result["latitude"], result["longitude"])
+        location = {
+            "name": result["name"],
+            "latitude": result["latitude"],
+            "longitude": result["longitude"],
+        }
+        _location_cache[key] = location
+        return location
     except Exception as e:
         logger.error(f"Error getting coordinates for {city}: {str(e)}")
         return None
 
 
-def get_weather(city: str) -> Dict[str, Any]:
-    """Get the current weather for a specific city using Open-Meteo API."""
+def _city_key(city: str) -> str:
+    return " ".join(city.split()).lower()
+
+
+def is_same_city(city: str, name: str) -> bool:
+    """Check whether a city as written by the user is the place the geocoder
+    found, ignoring case, accents and spacing ("cusco" matches "Cusco")."""
+
+    def fold(text: str) -> str:
+        text = unicodedata.normalize("NFKD", _city_key(text))
+        return "".join(c for c in text if not unicodedata.combining(c))
+
+    return fold(city) == fold(name)
+
+
+def get_weather(city: str, language: str = "en") -> Dict[str, Any]:
+    """Get the current weather for a specific city using Open-Meteo API.
+
+    The condition is described in ``language`` ("en" or "es"). Concurrent
+    calls for the same city are coalesced into one request.
+    """
+    key = (_city_key(city), language)
+    return inflight_requests.do(key, _fetch_weather, city, language)
+
+
+async def aget_weather(city: str, language: str = "en") -> Dict[str, Any]:
+    """Async version of get_weather, coalesced with thread and async callers."""
+    key = (_city_key(city), language)
+    return await inflight_requests.ado(key, _fetch_weather, city, language)
+
+
+def _fetch_weather(city: str, language: str) -> Dict[str, Any]:
     logger.info(f"🔧 Getting weather for: {city}")
 
-    # Get coordinates for the city
-    coords = get_coordinates(city)
-    if not coords:
+    location = get_location(city)
+    if not location:
         return {"error": f"Could not find coordinates for {city}"}
 
-    lat, lon = coords
-
     try:
-        # Make API request to Open-Meteo
-        response = requests.get(
-            "https://api.open-meteo.com/v1/forecast",
-            params={
-                "latitude": lat,
-                "longitude": lon,
-                "current": "temperature_2m,relative_humidity_2m,weather_code",
-                "timezone": "auto",
-            },
-        )
-        response.raise_for_status()
-        data = response.json()
+        current = forecast_cache.get(location["latitude"], location["longitude"])
 
-        # Map weather codes to conditions
-        weather_codes = {
-            0: "clear sky",
-            1: "mainly clear",
-            2: "partly cloudy",
-            3: "overcast",
-            45: "foggy",
-            48: "depositing rime fog",
-            51: "light drizzle",
-            53: "moderate drizzle",
-            55: "dense drizzle",
-            61: "slight rain",
-            63: "moderate rain",
-            65: "heavy rain",
-            71: "slight snow fall",
-            73: "moderate snow fall",
-            75: "heavy snow fall",
-            77: "snow grains",
-            80: "slight rain showers",
-            81: "moderate rain showers",
-            82: "violent rain showers",
-            85: "slight snow showers",
-            86: "heavy snow showers",
-            95: "thunderstorm",
-            96: "thunderstorm with slight hail",
-            99: "thunderstorm with heavy hail",
-        }
-
-        current = data["current"]
-        weather_code = current["weather_code"]
-        condition = weather_codes.get(weather_code, "unknown")
+        if language not in WEATHER_CONDITIONS:
+            language = "en"
+        condition = WEATHER_CONDITIONS[language].get(
+            current["weather_code"], UNKNOWN_CONDITION[language]
+        )
 
         return {
             "temperature": current["temperature_2m"],
             "humidity": current["relative_humidity_2m"],
             "condition": condition,
+            "location": location["name"],
             "units": {"temperature": "°C", "humidity": "%"},
         }
 
@@ -97,6 +212,341 @@ def get_weather(city: str) -> Dict[str, Any]:
         return {"error": str(e)}
 
 
+def _fetch_current(lat: float, lon: float) -> Tuple[Dict[str, Any], int]:
+    """Fetch the `current` block and its update interval from Open-Meteo."""
+    response = requests.get(
+        "https://api.open-meteo.com/v1/forecast",
+        params={
+            "latitude": lat,
+            "longitude": lon,
+            "current": "temperature_2m,relative_humidity_2m,weather_code",
+            "timezone": "auto",
+        },
+    )
+    response.raise_for_status()
+    return parse_current(response.content)
+
+
+def parse_current(body: bytes) -> Tuple[Dict[str, Any], int]:
+    """Extract the `current` fields and update interval from a forecast response.
+
+    With orjson installed the whole payload is decoded in C; otherwise only
+    the `current` object is decoded with the standard library. Either way,
+    only the fields used by get_weather are kept.
+    """
+    if orjson is not None:
+        current = _decode_current_orjson(body)
+    else:
+        current = _decode_current_stdlib(body)
+
+    fields = {name: current[name] for name in _CURRENT_FIELDS}
+    return fields, current.get("interval", UPDATE_INTERVAL_SECONDS)
+
+
+def _decode_current_orjson(body: bytes) -> Dict[str, Any]:
+    return orjson.loads(body)["current"]
+
+
+def _decode_current_stdlib(body: bytes) -> Dict[str, Any]:
+    text = body.decode("utf-8")
+    start = text.find(_CURRENT_MARKER)
+    if start != -1:
+        # Skip the whitespace between the key and the object, if any
+        start += len(_CURRENT_MARKER)
+        while start < len(text) and text[start].isspace():
+            start += 1
+        try:
+            current, _ = _json_decoder.raw_decode(text, start)
+        except json.JSONDecodeError:
+            current = None
+        if isinstance(current, dict):
+            return current
+    return json.loads(text)["current"]
+
+
+class ForecastCache:
+    """Cache of current conditions keyed by rounded coordinates.
+
+    Entries expire at the next upstream update boundary, so a cached value is
+    never older than what Open-Meteo itself would return. Expired entries are
+    still served for up to ``max_stale`` seconds while a background refresh
+    fetches the new values (stale-while-revalidate).
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[float, float], Tuple[Dict[str, Any], int]],
+        precision: int = 2,
+        max_stale: float = UPDATE_INTERVAL_SECONDS,
+        grace: float = UPDATE_GRACE_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._fetch = fetch
+        self.precision = precision
+        self.max_stale = max_stale
+        self.grace = grace
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[float, float], Tuple[Dict[str, Any], float]] = {}
+        self._refreshing: set = set()
+        self._loads = SingleFlight("forecast-cache")
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._refreshes = 0
+
+    def get(self, lat: float, lon: float) -> Dict[str, Any]:
+        """Return the current conditions for the given coordinates."""
+        key = (round(lat, self.precision), round(lon, self.precision))
+        now = self._clock()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                current, expires_at = entry
+                if now < expires_at:
+                    self._hits += 1
+                    return current
+                if now < expires_at + self.max_stale:
+                    self._stale_hits += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(
+                            target=self._refresh, args=(key,), daemon=True
+                        ).start()
+                    return current
+            self._misses += 1
+
+        return self._loads.do(key, self._load, key)
+
+    def _load(self, key: Tuple[float, float]) -> Dict[str, Any]:
+        current, interval = self._fetch(*key)
+        fetched_at = self._clock()
+        expires_at = (math.floor(fetched_at / interval) + 1) * interval + self.grace
+        with self._lock:
+            self._entries[key] = (current, expires_at)
+        return current
+
+    def _refresh(self, key: Tuple[float, float]) -> None:
+        try:
+            self._loads.do(key, self._load, key)
+            with self._lock:
+                self._refreshes += 1
+        except Exception as e:
+            logger.warning(f"Background weather refresh failed for {key}: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit, stale hit, miss and background refresh counters."""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "stale_hits": self._stale_hits,
+                "misses": self._misses,
+                "refreshes": self._refreshes,
+                "entries": len(self._entries),
+            }
+
+
+forecast_cache = ForecastCache(_fetch_current)
+
+
+def get_forecast(
+    city: str,
+    days: int = 3,
+    hourly: Sequence[str] = FORECAST_HOURLY_VARIABLES,
+    daily: Sequence[str] = FORECAST_DAILY_VARIABLES,
+) -> Dict[str, Any]:
+    """Get hourly and daily forecast series for a city using Open-Meteo API.
+
+    Only the given variables are requested. Series are returned as columnar
+    arrays: ``forecast["hourly"]["time"]`` holds unix timestamps and every
+    other column is an ``array("d")`` aligned with it (missing values are
+    NaN). Use summarize_forecast to reduce them before handing them to an LLM.
+    """
+    hourly, daily = tuple(hourly), tuple(daily)
+    key = ("forecast", _city_key(city), days, hourly, daily)
+    return inflight_requests.do(key, _fetch_forecast, city, days, hourly, daily)
+
+
+def _fetch_forecast(
+    city: str, days: int, hourly: Tuple[str, ...], daily: Tuple[str, ...]
+) -> Dict[str, Any]:
+    logger.info(f"🔧 Getting {days}-day forecast for: {city}")
+
+    coords = get_coordinates(city)
+    if not coords:
+        return {"error": f"Could not find coordinates for {city}"}
+
+    lat, lon = coords
+    params = {
+        "latitude": lat,
+        "longitude": lon,
+        "forecast_days": days,
+        "timezone": "auto",
+        "timeformat": "unixtime",
+    }
+    if hourly:
+        params["hourly"] = ",".join(hourly)
+    if daily:
+        params["daily"] = ",".join(daily)
+
+    try:
+        response = requests.get("https://api.open-meteo.com/v1/forecast", params=params)
+        response.raise_for_status()
+        return parse_forecast(response.content)
+    except Exception as e:
+        logger.error(f"Error fetching forecast data: {str(e)}")
+        return {"error": str(e)}
+
+
+def parse_forecast(body: bytes) -> Dict[str, Any]:
+    """Convert an Open-Meteo forecast response into columnar arrays."""
+    data = orjson.loads(body) if orjson is not None else json.loads(body)
+
+    forecast = {
+        "timezone": data.get("timezone"),
+        "utc_offset_seconds": data.get("utc_offset_seconds", 0),
+        "units": {},
+    }
+    for section in ("hourly", "daily"):
+        block = data.get(section)
+        if not block:
+            continue
+        columns = {"time": array("q", block["time"])}
+        for name, values in block.items():
+            if name != "time":
+                columns[name] = array(
+                    "d", [math.nan if value is None else value for value in values]
+                )
+        forecast[section] = columns
+        forecast["units"][section] = data.get(f"{section}_units", {})
+    return forecast
+
+
+def _local_time(timestamp: int, utc_offset: int, fmt: str) -> str:
+    return datetime.fromtimestamp(timestamp + utc_offset, tz=timezone.utc).strftime(fmt)
+
+
+def _day_slices(times: array, utc_offset: int) -> List[Tuple[str, int, int]]:
+    """Split a timestamp column into (local date, start, end) runs."""
+    slices = []
+    start = 0
+    for i in range(1, len(times) + 1):
+        if (
+            i == len(times)
+            or (times[i] + utc_offset) // 86400 != (times[start] + utc_offset) // 86400
+        ):
+            slices.append((_local_time(times[start], utc_offset, "%Y-%m-%d"), start, i))
+            start = i
+    return slices
+
+
+def daily_stats(forecast: Dict[str, Any], variable: str) -> List[Dict[str, Any]]:
+    """Min, max and mean of an hourly variable for each local day."""
+    hourly = forecast["hourly"]
+    values = hourly[variable]
+    stats = []
+    for date, start, end in _day_slices(hourly["time"], forecast["utc_offset_seconds"]):
+        day = [v for v in values[start:end] if not math.isnan(v)]
+        if not day:
+            continue
+        stats.append(
+            {
+                "date": date,
+                "min": min(day),
+                "max": max(day),
+                "mean": round(math.fsum(day) / len(day), 1),
+                "sum": round(math.fsum(day), 1),
+            }
+        )
+    return stats
+
+
+def rain_windows(
+    forecast: Dict[str, Any],
+    threshold: float = 50.0,
+    variable: str = "precipitation_probability",
+) -> List[Dict[str, Any]]:
+    """Contiguous hours whose precipitation probability reaches ``threshold``."""
+    hourly = forecast["hourly"]
+    if variable not in hourly:
+        return []
+
+    times = hourly["time"]
+    probabilities = hourly[variable]
+    utc_offset = forecast["utc_offset_seconds"]
+    windows = []
+    start = None
+    for i in range(len(times) + 1):
+        rainy = i < len(times) and probabilities[i] >= threshold
+        if rainy and start is None:
+            start = i
+        elif not rainy and start is not None:
+            windows.append(
+                {
+                    "start": _local_time(times[start], utc_offset, "%Y-%m-%d %H:%M"),
+                    "end": _local_time(times[i - 1], utc_offset, "%Y-%m-%d %H:%M"),
+                    "max_probability": max(probabilities[start:i]),
+                }
+            )
+            start = None
+    return windows
+
+
+def summarize_forecast(
+    forecast: Dict[str, Any], rain_threshold: float = 50.0
+) -> Dict[str, Any]:
+    """Reduce a forecast to a few values per day plus the likely rain windows."""
+    days: Dict[str, Dict[str, Any]] = {}
+
+    if "hourly" in forecast:
+        hourly = forecast["hourly"]
+        if "temperature_2m" in hourly:
+            for day in daily_stats(forecast, "temperature_2m"):
+                days.setdefault(day["date"], {"date": day["date"]})["temperature"] = {
+                    "min": day["min"],
+                    "max": day["max"],
+                    "mean": day["mean"],
+                }
+        if "precipitation" in hourly:
+            for day in daily_stats(forecast, "precipitation"):
+                days.setdefault(day["date"], {"date": day["date"]})[
+                    "precipitation_total"
+                ] = day["sum"]
+        if "wind_speed_10m" in hourly:
+            for day in daily_stats(forecast, "wind_speed_10m"):
+                days.setdefault(day["date"], {"date": day["date"]})[
+                    "wind_speed_max"
+                ] = day["max"]
+
+    if "daily" in forecast:
+        daily = forecast["daily"]
+        utc_offset = forecast["utc_offset_seconds"]
+        for i, timestamp in enumerate(daily["time"]):
+            date = _local_time(timestamp, utc_offset, "%Y-%m-%d")
+            day = days.setdefault(date, {"date": date})
+            for name, values in daily.items():
+                if name != "time" and not math.isnan(values[i]):
+                    day[name] = values[i]
+
+    return {
+        "timezone": forecast.get("timezone"),
+        "days": [days[date] for date in sorted(days)],
+        "rain_windows": (
+            rain_windows(forecast, rain_threshold) if "hourly" in forecast else []
+        ),
+        "units": forecast["units"],
+    }
+
+
 def convert_celsius_to_fahrenheit(celsius: float) -> float:
     """Convert a temperature from Celsius to Fahrenheit."""
     return (celsius * 9 / 5) + 32